@@ -0,0 +1,125 @@
+"""Startup benchmark for macro.py.
+
+Prints an import-time breakdown and the wall-clock time from launching the
+interpreter to the first painted frame (the root window's <Map>), and exits
+non-zero when a budget is exceeded or pynput was imported before the window
+appeared.
+
+    python benchmark_startup.py [--runs 5] [--max-import 0.3] [--max-first-frame 1.0]
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+FIRST_FRAME_SCRIPT = r"""
+import json, sys, time
+start = time.perf_counter()
+import macro
+imported = time.perf_counter()
+app = macro.MacroRecorderGUI()
+report = {'import': imported - start}
+def on_map(event):
+    # Runs after the app's own <Map> handler has painted the window,
+    # and before the deferred startup work it scheduled
+    if event.widget is app.root and 'pynput_before_first_frame' not in report:
+        report['pynput_before_first_frame'] = 'pynput' in sys.modules
+        print('FIRST_FRAME', flush=True)
+app.root.bind('<Map>', on_map, add='+')
+while 'pynput_before_first_frame' not in report:
+    app.root.update()
+print(json.dumps(report), flush=True)
+app.recorder.exit_flag = True
+app.root.destroy()
+"""
+
+
+def import_breakdown():
+    """Return ({module: seconds} for macro and its direct imports, all imported module names)."""
+    # -X importtime reports cumulative microseconds per module on stderr,
+    # children before their parent and indented two spaces per level
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import macro'],
+        cwd=HERE, capture_output=True, text=True, check=True
+    )
+    breakdown = {}
+    children = {}
+    modules = set()
+    for line in result.stderr.splitlines():
+        match = re.match(r'import time:\s+\d+ \|\s+(\d+) \|( *)(\S+)', line)
+        if not match:
+            continue
+        seconds = int(match.group(1)) / 1e6
+        depth = (len(match.group(2)) - 1) // 2
+        name = match.group(3)
+        modules.add(name)
+        if depth == 1:
+            children[name] = seconds
+        elif depth == 0:
+            if name == 'macro':
+                breakdown = dict(children, macro=seconds)
+            children = {}
+    return breakdown, modules
+
+
+def first_frame():
+    # Wall-clock time from launching the interpreter until the child reports the painted window
+    launched = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, '-c', FIRST_FRAME_SCRIPT],
+        cwd=HERE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+    )
+    for line in process.stdout:
+        if line.strip() == 'FIRST_FRAME':
+            painted = time.perf_counter()
+            break
+    else:
+        painted = None
+    output, errors = process.communicate()
+    if painted is None or process.returncode != 0:
+        raise RuntimeError(f"startup run failed:\n{errors}")
+    run = json.loads(output.strip().splitlines()[-1])
+    run['first_frame'] = painted - launched
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure macro.py cold start")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--max-import', type=float, default=0.3, help="seconds")
+    parser.add_argument('--max-first-frame', type=float, default=1.0, help="seconds, including interpreter start")
+    args = parser.parse_args()
+
+    breakdown, modules = import_breakdown()
+    print("Import-time breakdown (macro and its direct imports, cumulative):")
+    for name, seconds in sorted(breakdown.items(), key=lambda item: -item[1])[:10]:
+        print(f"  {name:<24} {seconds * 1000:8.1f} ms")
+
+    runs = [first_frame() for _ in range(args.runs)]
+    import_time = min(run['import'] for run in runs)
+    first_frame_time = min(run['first_frame'] for run in runs)
+    print(f"import macro:        {import_time * 1000:8.1f} ms (best of {args.runs})")
+    print(f"time to first frame: {first_frame_time * 1000:8.1f} ms (best of {args.runs}, from launch)")
+
+    failures = []
+    if 'pynput' in modules:
+        failures.append("pynput is imported at module load")
+    if any(run['pynput_before_first_frame'] for run in runs):
+        failures.append("pynput was imported before the first frame")
+    if import_time > args.max_import:
+        failures.append(f"import took {import_time:.3f}s (budget {args.max_import}s)")
+    if first_frame_time > args.max_first_frame:
+        failures.append(f"first frame took {first_frame_time:.3f}s (budget {args.max_first_frame}s)")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""Replay verification benchmark for macro.py.
+
+Builds a synthetic recording (100k events by default), simulates replays of it
+as traced by TracingMouseController, and times ReplayTrace.compare. Exits
+non-zero when a comparison exceeds the budget or a scenario gets the wrong
+verdict: clean, lossy, resampled and fast-corner replays must pass, while a
+2x slower replay or one whose cursor lands off the path must fail.
+
+    python benchmark_verify.py [--events 100000] [--max-seconds 5]
+"""
+import argparse
+import math
+import random
+import sys
+from types import SimpleNamespace
+
+import macro
+
+LEFT = SimpleNamespace(name='left')
+
+
+def synthetic_recording(events):
+    # Mouse moves at ~1 kHz along a curve, with a left click every 1000 events
+    actions = []
+    for i in range(events):
+        if i % 1000 == 998:
+            actions.append(('click', actions[-1][1], actions[-1][2], LEFT, True, 0.05))
+        elif i % 1000 == 999:
+            actions.append(('click', actions[-1][1], actions[-1][2], LEFT, False, 0.08))
+        else:
+            x = 960 + 600 * math.sin(i / 400)
+            y = 540 + 300 * math.sin(i / 170)
+            actions.append(('move', round(x), round(y), 0.001))
+    return actions
+
+
+def corner_recording(step, repeats):
+    # Fast L-shaped strokes sampled every 8 ms, each ending in a click
+    actions = []
+    for _ in range(repeats):
+        x, y = 200, 200
+        actions.append(('move', x, y, 0.3))
+        for dx, dy in ((step, 0), (0, step)):
+            for _ in range(40):
+                x, y = x + dx, y + dy
+                actions.append(('move', x, y, 0.008))
+        actions.append(('click', x, y, LEFT, True, 0.05))
+        actions.append(('click', x, y, LEFT, False, 0.08))
+    return actions
+
+
+def simulated_replay(recorder, plan, jitter, drop, rng, slowdown=1.0, offset=0):
+    # Mirrors replay_pass: every delay oversleeps a little and the cursor lands where it was sent
+    trace = macro.ReplayTrace()
+    elapsed = 0.0
+    for action in plan:
+        elapsed += action[-1] * slowdown + rng.random() * jitter
+        if action[0] == 'move' and rng.random() < drop:
+            continue
+        x = int((action[1] - recorder.offset_x) / recorder.scale_x) + offset
+        y = int((action[2] - recorder.offset_y) / recorder.scale_y)
+        trace.add(macro.ReplayTrace.MOVE, x, y, at=elapsed)
+        if action[0] == 'click':
+            kind = macro.ReplayTrace.PRESS if action[4] else macro.ReplayTrace.RELEASE
+            trace.add(kind, x, y, label=action[3].name, at=elapsed)
+    return trace
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure replay verification speed")
+    parser.add_argument('--events', type=int, default=100000)
+    parser.add_argument('--max-seconds', type=float, default=5.0, help="budget per comparison")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    recorder = macro.MouseRecorderRepeater(defer_config=True)
+    recorder.log = lambda message: None
+    recorder.actions = synthetic_recording(args.events)
+    print(f"{len(recorder.build_expected_trace(recorder.actions))} recorded events")
+
+    # Like repeat_actions, each replay is checked against its own plan
+    scenarios = []
+
+    def add_scenario(name, should_pass, **replay):
+        plan = recorder.plan_actions()
+        trace = simulated_replay(recorder, plan, 0.0002, rng=rng, **replay)
+        scenarios.append((name, recorder.build_expected_trace(plan), trace, should_pass))
+
+    add_scenario("raw, clean", True, drop=0.0)
+    add_scenario("raw, 2% moves dropped", True, drop=0.02)
+    add_scenario("raw, 2x slower", False, drop=0.0, slowdown=2.0)
+    recorder.motion_rate = 120
+    add_scenario("resampled @ 120 Hz", True, drop=0.0)
+    add_scenario("resampled, cursor 5px off", False, drop=0.0, offset=5)
+
+    # Fast corners, which fixed-rate sampling cuts
+    recorder.motion_rate = 60
+    for step in (15, 30):
+        recorder.actions = corner_recording(step, 50)
+        for interpolation in ('spline', 'linear'):
+            recorder.motion_interpolation = interpolation
+            add_scenario(f"corners {step}px/8ms @ 60 Hz {interpolation}", True, drop=0.0)
+
+    failures = []
+    for name, expected, trace, should_pass in scenarios:
+        report = expected.compare(trace, position_tolerance=recorder.verify_position_tolerance,
+                                  timing_tolerance=recorder.verify_timing_tolerance,
+                                  duration_tolerance=recorder.verify_duration_tolerance)
+        print(f"  {name:<32} {len(trace):>7} traced  {report['compare_seconds']:6.2f}s  "
+              f"{'PASSED' if report['passed'] else 'FAILED'}  "
+              f"pos max {report['max_position_error']:.1f}px  "
+              f"timing max {report['max_timing_error'] * 1000:.1f}ms  "
+              f"segment drift max {report['max_segment_drift'] * 1000:.0f}ms  "
+              f"drift final {report['final_timing_drift'] * 1000:.0f}ms")
+        if report['compare_seconds'] > args.max_seconds:
+            failures.append(f"{name}: compare took {report['compare_seconds']:.2f}s (budget {args.max_seconds}s)")
+        if report['passed'] != should_pass:
+            failures.append(f"{name}: expected {'PASSED' if should_pass else 'FAILED'}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,32 +2,391 @@ import time
 import threading
 import json
 import os
-import ctypes
+import math
+from array import array
 import tkinter as tk
 from tkinter import ttk, scrolledtext
-from pynput import mouse, keyboard
-from pynput.mouse import Button, Controller as MouseController
-from pynput.keyboard import Key, Controller as KeyboardController
 
-# Hide console window on Windows
-if os.name == 'nt':
-    import ctypes
-    ctypes.windll.user32.ShowWindow(ctypes.windll.kernel32.GetConsoleWindow(), 0)
+# pynput is imported on first use (see import_pynput), after the window is up
+mouse = keyboard = Button = Key = MouseController = KeyboardController = None
+pynput_lock = threading.RLock()
+
+def import_pynput():
+    global mouse, keyboard, Button, Key, MouseController, KeyboardController
+    with pynput_lock:
+        if mouse is None:
+            from pynput import keyboard as keyboard_module, mouse as mouse_module
+            Button, MouseController = mouse_module.Button, mouse_module.Controller
+            Key, KeyboardController = keyboard_module.Key, keyboard_module.Controller
+            keyboard = keyboard_module
+            mouse = mouse_module
+
+class StateEventBus:
+    """Collects state-change events from any thread and delivers them, coalesced, on the Tk thread."""
+
+    def __init__(self, root, coalesce_ms=30):
+        self.root = root
+        self.coalesce_ms = coalesce_ms
+        self.subscribers = {}
+        self.pending = set()
+        self.flush_scheduled = False
+        self.closed = False
+        self.lock = threading.Lock()
+
+    def subscribe(self, topic, callback):
+        self.subscribers.setdefault(topic, []).append(callback)
+
+    def publish(self, topic):
+        with self.lock:
+            if self.closed:
+                return
+            self.pending.add(topic)
+            if self.flush_scheduled:
+                return
+            self.flush_scheduled = True
+        try:
+            self.root.after(self.coalesce_ms, self.flush)
+        except (RuntimeError, tk.TclError):
+            # The root is gone; listener threads may still be publishing
+            self.close()
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+            self.pending.clear()
+
+    def flush(self):
+        with self.lock:
+            topics = self.pending
+            self.pending = set()
+            self.flush_scheduled = False
+        for topic in topics:
+            for callback in self.subscribers.get(topic, []):
+                callback()
+
+class ReplayTrace:
+    """Compact record of replayed controller calls, stored column-wise in typed arrays."""
+
+    MOVE, PRESS, RELEASE, KEY_PRESS, KEY_RELEASE = range(5)
+    label_codes = {}
+
+    def __init__(self):
+        self.kinds = array('b')
+        self.xs = array('i')
+        self.ys = array('i')
+        self.codes = array('i')
+        self.times = array('d')
+        self.start = time.perf_counter()
+
+    def __len__(self):
+        return len(self.kinds)
+
+    @classmethod
+    def code_for(cls, label):
+        return cls.label_codes.setdefault(label, len(cls.label_codes) + 1)
+
+    @staticmethod
+    def key_label(key):
+        if isinstance(key, str):
+            return key if len(key) == 1 else key.lower()
+        return getattr(key, 'name', str(key))
+
+    def add(self, kind, x, y, label=None, at=None):
+        self.kinds.append(kind)
+        self.xs.append(x)
+        self.ys.append(y)
+        self.codes.append(self.code_for(label) if label is not None else 0)
+        self.times.append(time.perf_counter() - self.start if at is None else at)
+
+    def compare(self, actual, position_tolerance=2, timing_tolerance=0.1, duration_tolerance=0.25, band=12):
+        """Align `actual` against this (expected) trace and return a verification report.
+
+        Clicks and key events act as anchors that must match in order; the mouse
+        moves between consecutive anchors are aligned with a banded DTW. Position
+        error is measured against the other trace's path. Timing is checked on the
+        gap between consecutive matched events, and each anchor segment may take at
+        most `timing_tolerance` plus `duration_tolerance` (a fraction of its recorded
+        length) longer or shorter than recorded, which leaves room for ordinary sleep
+        overshoot but fails a replay that runs markedly slow or fast.
+        """
+        compare_start = time.perf_counter()
+        expected_anchors = [i for i, kind in enumerate(self.kinds) if kind != self.MOVE]
+        actual_anchors = [i for i, kind in enumerate(actual.kinds) if kind != self.MOVE]
+
+        anchor_mismatch = None
+        matched_anchors = 0
+        for e, a in zip(expected_anchors, actual_anchors):
+            if self.kinds[e] != actual.kinds[a] or self.codes[e] != actual.codes[a]:
+                anchor_mismatch = matched_anchors
+                break
+            matched_anchors += 1
+        if anchor_mismatch is None and len(expected_anchors) != len(actual_anchors):
+            anchor_mismatch = matched_anchors
+
+        pairs = []
+        position_errors = []
+        segment_drifts = []
+        segments_on_time = True
+        unmatched = 0
+        e_prev = a_prev = -1
+        segment_ends = list(zip(expected_anchors[:matched_anchors], actual_anchors[:matched_anchors]))
+        if anchor_mismatch is None:
+            segment_ends.append((len(self), len(actual)))
+        for e_end, a_end in segment_ends:
+            expected_range = range(e_prev + 1, e_end)
+            actual_range = range(a_prev + 1, a_end)
+            # Time the segment relative to the anchor that opens it
+            e_base = self.times[e_prev] if e_prev >= 0 else 0.0
+            a_base = actual.times[a_prev] if a_prev >= 0 else 0.0
+            segment_pairs = self.align_moves(actual, expected_range, actual_range, e_base, a_base,
+                                             position_tolerance, timing_tolerance, band)
+            if segment_pairs is None:
+                unmatched += len(expected_range) + len(actual_range)
+            else:
+                pairs.extend(segment_pairs)
+                position_errors.extend(self.path_errors(
+                    actual, segment_pairs,
+                    self.path_range(e_prev, e_end), actual.path_range(a_prev, a_end)
+                ))
+            if e_end < len(self):
+                pairs.append((e_end, a_end))
+                position_errors.append(math.hypot(self.xs[e_end] - actual.xs[a_end],
+                                                  self.ys[e_end] - actual.ys[a_end]))
+
+            # Compare how long the segment took with how long it was recorded to take
+            closing = (e_end, a_end) if e_end < len(self) else (segment_pairs[-1] if segment_pairs else None)
+            if closing is not None:
+                expected_duration = self.times[closing[0]] - e_base
+                drift = (actual.times[closing[1]] - a_base) - expected_duration
+                segment_drifts.append(drift)
+                if abs(drift) > timing_tolerance + duration_tolerance * expected_duration:
+                    segments_on_time = False
+            e_prev, a_prev = e_end, a_end
+
+        timing_errors = []
+        e_last = a_last = None
+        for e, a in pairs:
+            expected_gap = self.times[e] - (self.times[e_last] if e_last is not None else 0.0)
+            actual_gap = actual.times[a] - (actual.times[a_last] if a_last is not None else 0.0)
+            timing_errors.append(abs(actual_gap - expected_gap))
+            e_last, a_last = e, a
+        drifts = [actual.times[a] - self.times[e] for e, a in pairs]
+
+        report = {
+            'events_expected': len(self),
+            'events_traced': len(actual),
+            'anchors_matched': matched_anchors,
+            'anchor_mismatch': anchor_mismatch,
+            'unmatched_events': unmatched,
+            'max_position_error': max(position_errors, default=0.0),
+            'mean_position_error': sum(position_errors) / len(position_errors) if position_errors else 0.0,
+            'max_timing_error': max(timing_errors, default=0.0),
+            'mean_timing_error': sum(timing_errors) / len(timing_errors) if timing_errors else 0.0,
+            'max_segment_drift': max((abs(d) for d in segment_drifts), default=0.0),
+            'max_timing_drift': max((abs(d) for d in drifts), default=0.0),
+            'mean_timing_drift': sum(drifts) / len(drifts) if drifts else 0.0,
+            'final_timing_drift': drifts[-1] if drifts else 0.0,
+        }
+        report['passed'] = (anchor_mismatch is None and unmatched == 0
+                            and report['max_position_error'] <= position_tolerance
+                            and report['max_timing_error'] <= timing_tolerance
+                            and segments_on_time)
+        report['compare_seconds'] = time.perf_counter() - compare_start
+        return report
+
+    def align_moves(self, actual, expected_range, actual_range, e_base, a_base,
+                    position_tolerance, timing_tolerance, band):
+        n = len(expected_range)
+        m = len(actual_range)
+        if n == 0 and m == 0:
+            return []
+        if n == 0 or m == 0:
+            return None
+
+        ex, ey, et = self.xs, self.ys, self.times
+        ax, ay, at = actual.xs, actual.ys, actual.times
+        e0 = expected_range.start
+        a0 = actual_range.start
+        offset = a_base - e_base
+
+        # Fast path: an unresampled replay that hit every point is already a valid warping path
+        if n == m and all(math.hypot(ex[e0 + i] - ax[a0 + i], ey[e0 + i] - ay[a0 + i]) <= position_tolerance
+                          for i in range(n)):
+            return [(e0 + i, a0 + i) for i in range(n)]
+
+        # Banded DTW around the length-adjusted diagonal (Sakoe-Chiba window)
+        slope = (m - 1) / (n - 1) if n > 1 else 0
+        bounds = []
+        steps = []
+        previous = None
+        for i in range(n):
+            center = i * slope
+            lo = max(0, int(center) - band)
+            hi = min(m - 1, int(math.ceil(center)) + band)
+            if previous is not None:
+                # Keep the window connected to the previous row
+                lo = min(lo, previous[1] + 1)
+            if i == n - 1:
+                hi = m - 1
+            row = [0.0] * (hi - lo + 1)
+            step = bytearray(hi - lo + 1)
+            x, y, t = ex[e0 + i], ey[e0 + i], et[e0 + i] + offset
+            for j in range(lo, hi + 1):
+                best = math.inf
+                move = 0
+                if previous is not None:
+                    p_lo, p_hi, p_row = previous
+                    if p_lo <= j - 1 <= p_hi and p_row[j - 1 - p_lo] < best:
+                        best, move = p_row[j - 1 - p_lo], 0
+                    if p_lo <= j <= p_hi and p_row[j - p_lo] < best:
+                        best, move = p_row[j - p_lo], 1
+                if j > lo and row[j - 1 - lo] < best:
+                    best, move = row[j - 1 - lo], 2
+                if best == math.inf:
+                    best = 0.0 if i == 0 and j == 0 else math.inf
+                k = a0 + j
+                row[j - lo] = (best + math.hypot(x - ax[k], y - ay[k]) / position_tolerance
+                               + abs(at[k] - t) / timing_tolerance)
+                step[j - lo] = move
+            bounds.append(lo)
+            steps.append(step)
+            previous = (lo, hi, row)
+
+        # Walk the warping path back from the final corner
+        pairs = []
+        i, j = n - 1, m - 1
+        while i >= 0 and j >= 0:
+            pairs.append((e0 + i, a0 + j))
+            if i == 0 and j == 0:
+                break
+            move = steps[i][j - bounds[i]]
+            if move == 0:
+                i, j = i - 1, j - 1
+            elif move == 1:
+                i -= 1
+            else:
+                j -= 1
+        pairs.reverse()
+        return pairs
+
+    def path_range(self, start, end):
+        # A segment's path runs from the click that opens it to the click that closes it;
+        # key events carry no position, so they do not extend the path
+        mouse_anchors = (self.PRESS, self.RELEASE)
+        lo = start if start >= 0 and self.kinds[start] in mouse_anchors else start + 1
+        hi = end + 1 if end < len(self) and self.kinds[end] in mouse_anchors else end
+        return range(lo, hi)
+
+    def path_errors(self, actual, pairs, expected_range, actual_range):
+        # Resampled moves are sparser than the recording, so each point is measured against
+        # the other trace's path around its partners, keeping the closest when it has several
+        expected_errors = {}
+        actual_errors = {}
+        for e, a in pairs:
+            forward = self.distance_to_path(actual, self.xs[e], self.ys[e], a, actual_range)
+            backward = self.distance_to_path(self, actual.xs[a], actual.ys[a], e, expected_range)
+            expected_errors[e] = min(forward, expected_errors.get(e, math.inf))
+            actual_errors[a] = min(backward, actual_errors.get(a, math.inf))
+        return list(expected_errors.values()) + list(actual_errors.values())
+
+    @staticmethod
+    def distance_to_path(trace, px, py, index, index_range):
+        xs, ys = trace.xs, trace.ys
+        best = math.hypot(px - xs[index], py - ys[index])
+        for other in (index - 1, index + 1):
+            if other not in index_range:
+                continue
+            x1, y1, x2, y2 = xs[index], ys[index], xs[other], ys[other]
+            dx, dy = x2 - x1, y2 - y1
+            length = dx * dx + dy * dy
+            if length == 0:
+                continue
+            t = max(0.0, min(1.0, ((px - x1) * dx + (py - y1) * dy) / length))
+            best = min(best, math.hypot(px - (x1 + t * dx), py - (y1 + t * dy)))
+        return best
+
+class TracingMouseController:
+    """Forwards calls to a mouse controller and appends each one to a ReplayTrace."""
+
+    def __init__(self, controller, trace):
+        self.controller = controller
+        self.trace = trace
+        self.last_position = (0, 0)
+
+    @property
+    def position(self):
+        return self.controller.position
+
+    @position.setter
+    def position(self, value):
+        self.controller.position = value
+        # Record where the cursor actually ended up, not what was requested
+        x, y = self.controller.position
+        self.last_position = (round(x), round(y))
+        self.trace.add(ReplayTrace.MOVE, *self.last_position)
+
+    def press(self, button):
+        self.controller.press(button)
+        self.trace.add(ReplayTrace.PRESS, *self.last_position, label=button.name)
+
+    def release(self, button):
+        self.controller.release(button)
+        self.trace.add(ReplayTrace.RELEASE, *self.last_position, label=button.name)
+
+class TracingKeyboardController:
+    """Forwards calls to a keyboard controller and appends each one to a ReplayTrace."""
+
+    def __init__(self, controller, trace):
+        self.controller = controller
+        self.trace = trace
+
+    def press(self, key):
+        self.controller.press(key)
+        self.trace.add(ReplayTrace.KEY_PRESS, 0, 0, label=ReplayTrace.key_label(key))
+
+    def release(self, key):
+        self.controller.release(key)
+        self.trace.add(ReplayTrace.KEY_RELEASE, 0, 0, label=ReplayTrace.key_label(key))
 
 class MouseRecorderRepeater:
-    def __init__(self, gui_callback=None):
-        self.mouse = MouseController()
-        self.keyboard = KeyboardController()
+    def __init__(self, gui_callback=None, event_bus=None, tk_root=None, defer_config=False):
+        self.mouse = None
+        self.keyboard = None
         self.actions = []
         self.recording = False
         self.repeating = False
         self.calibrating = False
+        self.verifying = False
         self.exit_flag = False
         self.last_action_time = None
         self.calibration_points = []
         self.config_file = 'mouse_recorder_config.json'
+        self.motion_rate = 0  # Hz, 0 replays moves exactly as recorded
+        self.motion_interpolation = 'spline'
+        self.motion_pause_gap = 0.1  # seconds without movement that count as a pause, not a slow move
+        self.verify_replay = False
+        self.verify_position_tolerance = 2  # pixels
+        self.verify_timing_tolerance = 0.1  # seconds, per gap between consecutive events
+        self.verify_duration_tolerance = 0.25  # fraction of each click-to-click segment's length
+        self.screen_width = 1920
+        self.screen_height = 1080
+        self.scale_x = 1.0
+        self.scale_y = 1.0
+        self.offset_x = 0
+        self.offset_y = 0
         self.gui_callback = gui_callback
-        self.load_config()
+        self.event_bus = event_bus
+        self.tk_root = tk_root
+        if not defer_config:
+            self.load_config()
+
+    def ensure_controllers(self):
+        # Called from both the listener and replay threads
+        with pynput_lock:
+            if self.mouse is None:
+                import_pynput()
+                self.mouse = MouseController()
+                self.keyboard = KeyboardController()
 
     def load_config(self):
         if os.path.exists(self.config_file):
@@ -39,7 +398,10 @@ class MouseRecorderRepeater:
             self.offset_y = config.get('offset_y', 0)
             self.screen_width = config.get('screen_width', 1920)
             self.screen_height = config.get('screen_height', 1080)
+            self.motion_rate = config.get('motion_rate', 0)
+            self.motion_interpolation = config.get('motion_interpolation', 'spline')
             self.log(f"Loaded configuration: Scale ({self.scale_x}, {self.scale_y}), Offset ({self.offset_x}, {self.offset_y})")
+            self.notify('config')
         else:
             self.detect_screen_info()
 
@@ -50,22 +412,27 @@ class MouseRecorderRepeater:
             'offset_x': self.offset_x,
             'offset_y': self.offset_y,
             'screen_width': self.screen_width,
-            'screen_height': self.screen_height
+            'screen_height': self.screen_height,
+            'motion_rate': self.motion_rate,
+            'motion_interpolation': self.motion_interpolation
         }
         with open(self.config_file, 'w') as f:
             json.dump(config, f)
         self.log(f"Saved configuration to {self.config_file}")
+        self.notify('config')
 
     def detect_screen_info(self):
         try:
-            import tkinter as tk
-            root = tk.Tk()
-            root.withdraw()
+            # Reuse the GUI's root when there is one instead of creating a second Tk
+            root = self.tk_root or tk.Tk()
+            if root is not self.tk_root:
+                root.withdraw()
             
             self.screen_width = root.winfo_screenwidth()
             self.screen_height = root.winfo_screenheight()
             
             if os.name == 'nt':
+                import ctypes
                 user32 = ctypes.windll.user32
                 user32.SetProcessDPIAware()
                 
@@ -74,7 +441,8 @@ class MouseRecorderRepeater:
             self.offset_x = 0
             self.offset_y = 0
             
-            root.destroy()
+            if root is not self.tk_root:
+                root.destroy()
             
             self.log(f"Auto-detected screen: {self.screen_width}x{self.screen_height}")
             self.save_config()
@@ -92,6 +460,11 @@ class MouseRecorderRepeater:
         if self.gui_callback:
             self.gui_callback(message)
 
+    def notify(self, topic):
+        # Topics: 'state' (recording/replay/calibration), 'actions', 'config'
+        if self.event_bus:
+            self.event_bus.publish(topic)
+
     def on_press(self, key):
         try:
             # Control keys for the application
@@ -105,6 +478,7 @@ class MouseRecorderRepeater:
                 self.log("Exiting...")
                 self.exit_flag = True
                 self.repeating = False
+                self.notify('state')
                 return False
             # Record keyboard events during recording (if enabled)
             elif self.recording and getattr(self, 'keyboard_recording_enabled', True):
@@ -117,6 +491,7 @@ class MouseRecorderRepeater:
                 
                 self.actions.append(('keypress', key_name, True, current_time - self.last_action_time))
                 self.last_action_time = current_time
+                self.notify('actions')
                 self.log(f"Recorded key press: {key_name}")
         except AttributeError:
             pass
@@ -133,6 +508,7 @@ class MouseRecorderRepeater:
                 
                 self.actions.append(('keypress', key_name, False, current_time - self.last_action_time))
                 self.last_action_time = current_time
+                self.notify('actions')
                 self.log(f"Recorded key release: {key_name}")
             except AttributeError:
                 pass
@@ -142,6 +518,7 @@ class MouseRecorderRepeater:
             self.log("Starting calibration. Click on the top-left corner of your screen, then the bottom-right corner.")
             self.calibrating = True
             self.calibration_points = []
+            self.notify('state')
 
     def on_click(self, x, y, button, pressed):
         if self.calibrating and pressed:
@@ -151,10 +528,12 @@ class MouseRecorderRepeater:
             elif len(self.calibration_points) == 2:
                 self.calculate_calibration()
                 self.calibrating = False
+                self.notify('state')
         elif self.recording:
             current_time = time.time()
             self.actions.append(('click', x, y, button, pressed, current_time - self.last_action_time))
             self.last_action_time = current_time
+            self.notify('actions')
             if pressed:
                 self.log(f"Recorded {'right' if button == Button.right else 'left'} click at ({x}, {y})")
 
@@ -176,72 +555,318 @@ class MouseRecorderRepeater:
             self.actions = []
             self.recording = True
             self.last_action_time = time.time()
+            self.notify('actions')
         else:
             self.recording = False
             self.log(f"Recording stopped. {len(self.actions)} actions recorded.")
+        self.notify('state')
 
     def toggle_repeating(self):
         if not self.repeating:
-            if self.actions:
+            if self.verifying:
+                self.log("Still verifying the last replay, start again once it finishes.")
+            elif self.actions:
                 self.log("Replaying actions...")
                 self.repeating = True
+                # Set before the thread starts so a quick restart cannot slip past the check above
+                self.verifying = self.verify_replay
                 threading.Thread(target=self.repeat_actions, daemon=True).start()
             else:
                 self.log("No actions recorded yet.")
         else:
             self.repeating = False
             self.log("Replaying stopped.")
+        self.notify('state')
 
     def on_move(self, x, y):
         if self.recording:
             current_time = time.time()
             self.actions.append(('move', x, y, current_time - self.last_action_time))
             self.last_action_time = current_time
+            self.notify('actions')
 
-    def repeat_actions(self):
-        while self.repeating and not self.exit_flag:
-            for action in self.actions:
-                if not self.repeating or self.exit_flag:
+    def set_motion_rate(self, rate):
+        self.motion_rate = rate
+        if rate:
+            self.log(f"Motion resampling set to {rate} Hz ({self.motion_interpolation})")
+        else:
+            self.log("Motion resampling disabled, moves replay as recorded")
+        self.save_config()
+
+    def count_controller_calls(self, actions):
+        # A click positions the cursor before pressing/releasing
+        return sum(2 if action[0] == 'click' else 1 for action in actions)
+
+    def plan_actions(self):
+        if not self.motion_rate:
+            return list(self.actions)
+
+        plan = []
+        segment = []
+        for action in self.actions:
+            if action[0] == 'move':
+                segment.append(action)
+            else:
+                # Clicks and key events are kept as-is, so click positions stay exact
+                plan.extend(self.resample_motion(segment))
+                segment = []
+                plan.append(action)
+        plan.extend(self.resample_motion(segment))
+
+        recorded_calls = self.count_controller_calls(self.actions)
+        planned_calls = self.count_controller_calls(plan)
+        if recorded_calls:
+            reduction = (recorded_calls - planned_calls) / recorded_calls * 100
+            self.log(f"Motion plan @ {self.motion_rate} Hz: {recorded_calls} -> {planned_calls} "
+                     f"controller calls ({reduction:.0f}% fewer)")
+        return plan
+
+    def resample_motion(self, moves):
+        if len(moves) < 2:
+            return list(moves)
+
+        # Keypoint times are relative to the action preceding the segment
+        times = []
+        elapsed = 0.0
+        for move in moves:
+            elapsed += move[3]
+            times.append(elapsed)
+        points = [(move[1], move[2]) for move in moves]
+
+        step = 1.0 / self.motion_rate
+        resampled = [moves[0]]
+        last_time = times[0]
+        last_point = points[0]
+        index = 0
+        sample_time = times[0] + step
+        while sample_time < times[-1]:
+            while times[index + 1] <= sample_time:
+                index += 1
+            point = self.interpolate_point(points, times, index, sample_time)
+            # Skip samples that would not move the cursor
+            if point != last_point:
+                resampled.append(('move', point[0], point[1], sample_time - last_time))
+                last_time = sample_time
+                last_point = point
+            sample_time += step
+
+        # Always land on the final keypoint at its recorded time
+        resampled.append(('move', points[-1][0], points[-1][1], times[-1] - last_time))
+
+        # Sparse segments would only gain calls from resampling, so replay them as recorded
+        if len(resampled) >= len(moves):
+            return list(moves)
+        return resampled
+
+    def interpolate_point(self, points, times, index, sample_time):
+        span = times[index + 1] - times[index]
+        t = (sample_time - times[index]) / span if span > 0 else 1.0
+        p1 = points[index]
+        p2 = points[index + 1]
+
+        # The cursor sat still during a long gap, so hold it instead of drifting towards p2
+        if span > self.motion_pause_gap:
+            return p1
+
+        if self.motion_interpolation == 'linear':
+            x = p1[0] + (p2[0] - p1[0]) * t
+            y = p1[1] + (p2[1] - p1[1]) * t
+        else:
+            # Catmull-Rom spline, clamped at the segment ends
+            p0 = points[index - 1] if index > 0 else p1
+            p3 = points[index + 2] if index + 2 < len(points) else p2
+            t2 = t * t
+            t3 = t2 * t
+            x = 0.5 * (2 * p1[0] + (p2[0] - p0[0]) * t
+                       + (2 * p0[0] - 5 * p1[0] + 4 * p2[0] - p3[0]) * t2
+                       + (3 * p1[0] - p0[0] - 3 * p2[0] + p3[0]) * t3)
+            y = 0.5 * (2 * p1[1] + (p2[1] - p0[1]) * t
+                       + (2 * p0[1] - 5 * p1[1] + 4 * p2[1] - p3[1]) * t2
+                       + (3 * p1[1] - p0[1] - 3 * p2[1] + p3[1]) * t3)
+        return (round(x), round(y))
+
+    def build_expected_trace(self, actions):
+        expected = ReplayTrace()
+        elapsed = 0.0
+        for action in actions:
+            elapsed += action[-1]
+            if action[0] in ('move', 'click'):
+                scaled_x = int((action[1] - self.offset_x) / self.scale_x)
+                scaled_y = int((action[2] - self.offset_y) / self.scale_y)
+                expected.add(ReplayTrace.MOVE, scaled_x, scaled_y, at=elapsed)
+                if action[0] == 'click':
+                    kind = ReplayTrace.PRESS if action[4] else ReplayTrace.RELEASE
+                    expected.add(kind, scaled_x, scaled_y, label=action[3].name, at=elapsed)
+            elif action[0] == 'keypress':
+                kind = ReplayTrace.KEY_PRESS if action[2] else ReplayTrace.KEY_RELEASE
+                expected.add(kind, 0, 0, label=ReplayTrace.key_label(action[1]), at=elapsed)
+        return expected
+
+    def report_verification(self, report):
+        if report['anchor_mismatch'] is not None:
+            self.log(f"Replay verification: clicks/keys diverged after {report['anchors_matched']} matching events")
+        self.log(f"Replay verification {'PASSED' if report['passed'] else 'FAILED'}: "
+                 f"{report['events_traced']}/{report['events_expected']} events traced, "
+                 f"{report['unmatched_events']} unmatched | "
+                 f"Position error mean {report['mean_position_error']:.1f}px, max {report['max_position_error']:.1f}px | "
+                 f"Timing error mean {report['mean_timing_error'] * 1000:.1f}ms, max {report['max_timing_error'] * 1000:.1f}ms, "
+                 f"segment drift max {report['max_segment_drift'] * 1000:.1f}ms | "
+                 f"Cumulative drift max {report['max_timing_drift'] * 1000:.1f}ms, final {report['final_timing_drift'] * 1000:.1f}ms "
+                 f"(compared in {report['compare_seconds']:.2f}s)")
+
+    def load_macro_file(self, file_path):
+        import_pynput()
+        with open(file_path, 'r') as f:
+            macro_data = json.load(f)
+        
+        if 'actions' not in macro_data:
+            raise ValueError("Invalid macro file format")
+        
+        # Convert back to proper format
+        loaded_actions = []
+        for action in macro_data['actions']:
+            if action[0] == 'click':
+                # Convert button string back to button object
+                action[3] = Button.right if action[3] == 'right' else Button.left
+                loaded_actions.append(tuple(action))
+            elif action[0] == 'keypress':
+                # Keyboard actions are already in correct format
+                loaded_actions.append(tuple(action))
+            else:
+                # Mouse move actions
+                loaded_actions.append(tuple(action))
+        
+        self.actions = loaded_actions
+        self.notify('actions')
+        return macro_data
+
+    def verify_trace(self, expected, trace):
+        report = expected.compare(
+            trace,
+            position_tolerance=self.verify_position_tolerance,
+            timing_tolerance=self.verify_timing_tolerance,
+            duration_tolerance=self.verify_duration_tolerance
+        )
+        self.report_verification(report)
+        return report
+
+    def verify_traces(self, expected, traces):
+        # Runs after replay has stopped, one comparison at a time, so the pure-Python
+        # alignment never competes with a pass that is still being timed
+        try:
+            reports = []
+            for trace in traces:
+                if self.exit_flag:
                     break
+                reports.append(self.verify_trace(expected, trace))
+            return reports
+        finally:
+            self.verifying = False
+            self.notify('state')
 
-                time.sleep(action[-1])
+    def verify_macro_file(self, file_path, passes=1):
+        """Replay a saved macro with tracing and return True if every pass verifies."""
+        self.load_macro_file(file_path)
+        self.ensure_controllers()
+        plan = self.plan_actions()
+        expected = self.build_expected_trace(plan)
+        traces = []
+        self.verifying = True
+        self.repeating = True
+        try:
+            for _ in range(passes):
+                trace = self.traced_pass(plan)
+                if trace is None:
+                    break
+                traces.append(trace)
+        finally:
+            self.repeating = False
+        reports = self.verify_traces(expected, traces)
+        return len(reports) == passes and all(report['passed'] for report in reports)
 
-                if action[0] == 'move':
-                    scaled_x = (action[1] - self.offset_x) / self.scale_x
-                    scaled_y = (action[2] - self.offset_y) / self.scale_y
-                    self.mouse.position = (int(scaled_x), int(scaled_y))
-                elif action[0] == 'click':
-                    scaled_x = (action[1] - self.offset_x) / self.scale_x
-                    scaled_y = (action[2] - self.offset_y) / self.scale_y
-                    self.mouse.position = (int(scaled_x), int(scaled_y))
-                    
-                    if action[4]:  # pressed
-                        self.mouse.press(action[3])
-                        self.log(f"Replayed {'right' if action[3] == Button.right else 'left'} click at ({scaled_x}, {scaled_y})")
+    def repeat_actions(self):
+        self.ensure_controllers()
+        plan = self.plan_actions()
+        if not self.verify_replay:
+            while self.repeating and not self.exit_flag:
+                self.replay_pass(plan)
+            return
+
+        # Positions are checked against the path the cursor was sent along (the tracer reads
+        # back where it really went). The plan keeps every click and key event at its recorded
+        # time, so the segment timing is still checked against the recording. Checking
+        # resampled positions against the raw recording would fail on the corners that
+        # fixed-rate sampling cuts by design.
+        expected = self.build_expected_trace(plan)
+        traces = []
+        try:
+            while self.repeating and not self.exit_flag:
+                trace = self.traced_pass(plan)
+                if trace is not None:
+                    traces.append(trace)
+        finally:
+            if traces:
+                self.log(f"Verifying {len(traces)} replay pass(es)...")
+            self.verify_traces(expected, traces)
+
+    def traced_pass(self, plan):
+        trace = ReplayTrace()
+        mouse_controller = self.mouse
+        keyboard_controller = self.keyboard
+        self.mouse = TracingMouseController(mouse_controller, trace)
+        self.keyboard = TracingKeyboardController(keyboard_controller, trace)
+        try:
+            completed = self.replay_pass(plan)
+        finally:
+            self.mouse = mouse_controller
+            self.keyboard = keyboard_controller
+        return trace if completed else None
+
+    def replay_pass(self, plan):
+        for action in plan:
+            if not self.repeating or self.exit_flag:
+                return False
+
+            time.sleep(action[-1])
+
+            if action[0] == 'move':
+                scaled_x = (action[1] - self.offset_x) / self.scale_x
+                scaled_y = (action[2] - self.offset_y) / self.scale_y
+                self.mouse.position = (int(scaled_x), int(scaled_y))
+            elif action[0] == 'click':
+                scaled_x = (action[1] - self.offset_x) / self.scale_x
+                scaled_y = (action[2] - self.offset_y) / self.scale_y
+                self.mouse.position = (int(scaled_x), int(scaled_y))
+                
+                if action[4]:  # pressed
+                    self.mouse.press(action[3])
+                    self.log(f"Replayed {'right' if action[3] == Button.right else 'left'} click at ({scaled_x}, {scaled_y})")
+                else:
+                    self.mouse.release(action[3])
+            elif action[0] == 'keypress':
+                key_name, pressed = action[1], action[2]
+                
+                try:
+                    # Handle special keys
+                    if len(key_name) == 1:
+                        # Single character key
+                        key_obj = key_name
                     else:
-                        self.mouse.release(action[3])
-                elif action[0] == 'keypress':
-                    key_name, pressed = action[1], action[2]
+                        # Special key (like 'enter', 'space', etc.)
+                        key_obj = getattr(Key, key_name.lower(), key_name)
                     
-                    try:
-                        # Handle special keys
-                        if len(key_name) == 1:
-                            # Single character key
-                            key_obj = key_name
-                        else:
-                            # Special key (like 'enter', 'space', etc.)
-                            key_obj = getattr(Key, key_name.lower(), key_name)
-                        
-                        if pressed:
-                            self.keyboard.press(key_obj)
-                            self.log(f"Replayed key press: {key_name}")
-                        else:
-                            self.keyboard.release(key_obj)
-                            self.log(f"Replayed key release: {key_name}")
-                    except Exception as e:
-                        self.log(f"Error replaying key {key_name}: {e}")
+                    if pressed:
+                        self.keyboard.press(key_obj)
+                        self.log(f"Replayed key press: {key_name}")
+                    else:
+                        self.keyboard.release(key_obj)
+                        self.log(f"Replayed key release: {key_name}")
+                except Exception as e:
+                    self.log(f"Error replaying key {key_name}: {e}")
+        return True
 
     def run(self):
+        self.ensure_controllers()
         with mouse.Listener(on_move=self.on_move, on_click=self.on_click) as mouse_listener, \
              keyboard.Listener(on_press=self.on_press, on_release=self.on_release) as keyboard_listener:
             
@@ -256,13 +881,46 @@ class MacroRecorderGUI:
     def __init__(self):
         self.root = tk.Tk()
         self.root.title("Macro Recorder")
-        self.root.geometry("750x500")  # Increased width to accommodate all buttons + 50px
+        self.root.geometry("1000x500")  # Wide enough for all buttons and replay options
         self.root.resizable(True, True)
         
         self.setup_ui()
-        self.recorder = MouseRecorderRepeater(gui_callback=self.update_log)
-        self.start_listeners()
+        self.rendered_state = None
+        self.displayed_actions = None
+        self.displayed_action_count = 0
+        
+        # Widgets are refreshed only when the recorder publishes a change
+        self.event_bus = StateEventBus(self.root)
+        self.event_bus.subscribe('state', self.update_status)
+        self.event_bus.subscribe('actions', self.update_actions)
+        self.event_bus.subscribe('config', self.update_config)
+        
+        # Config loading and listener startup wait until the first frame is painted
+        self.recorder = MouseRecorderRepeater(gui_callback=self.update_log, event_bus=self.event_bus,
+                                              tk_root=self.root, defer_config=True)
+        self.first_frame_time = None
+        self.root.bind('<Map>', self.on_root_mapped, add='+')
         self.update_status()
+        self.update_actions()
+        self.update_config()
+        
+    def on_root_mapped(self, event):
+        # <Map> on the toplevel also fires for every child widget
+        if event.widget is not self.root or self.first_frame_time is not None:
+            return
+        # Paint the mapped window before doing the slower startup work
+        self.root.update_idletasks()
+        self.first_frame_time = time.perf_counter()
+        self.root.after(0, self.finish_startup)
+        
+    def finish_startup(self):
+        try:
+            self.recorder.load_config()
+        except Exception as e:
+            self.update_log(f"Error loading configuration: {e}")
+        finally:
+            self.motion_rate_var.set(f"{self.recorder.motion_rate} Hz" if self.recorder.motion_rate else "Raw")
+            self.start_listeners()
         
     def setup_ui(self):
         main_frame = ttk.Frame(self.root, padding="10")
@@ -303,7 +961,30 @@ class MacroRecorderGUI:
             variable=self.keyboard_enabled,
             command=self.toggle_keyboard_recording
         )
-        self.keyboard_checkbox.pack(side=tk.LEFT)
+        self.keyboard_checkbox.pack(side=tk.LEFT, padx=(0, 10))
+        
+        # Replay motion resampling rate
+        ttk.Label(button_frame, text="Motion:").pack(side=tk.LEFT, padx=(0, 5))
+        self.motion_rate_var = tk.StringVar(value="Raw")
+        self.motion_rate_combo = ttk.Combobox(
+            button_frame,
+            textvariable=self.motion_rate_var,
+            values=("Raw", "60 Hz", "120 Hz", "240 Hz"),
+            state="readonly",
+            width=7
+        )
+        self.motion_rate_combo.bind("<<ComboboxSelected>>", self.change_motion_rate)
+        self.motion_rate_combo.pack(side=tk.LEFT, padx=(0, 10))
+        
+        # Replay verification toggle
+        self.verify_enabled = tk.BooleanVar(value=False)
+        self.verify_checkbox = ttk.Checkbutton(
+            button_frame,
+            text="Verify Replay",
+            variable=self.verify_enabled,
+            command=self.toggle_verify_replay
+        )
+        self.verify_checkbox.pack(side=tk.LEFT)
         
         # Status display
         status_frame = ttk.LabelFrame(main_frame, text="Status", padding="5")
@@ -398,21 +1079,17 @@ class MacroRecorderGUI:
         
     def toggle_recording(self):
         self.recorder.toggle_recording()
-        self.update_status()
         
     def toggle_replay(self):
         self.recorder.toggle_repeating()
-        self.update_status()
         
     def start_calibration(self):
         self.recorder.start_calibration()
-        self.update_status()
         
     def clear_actions(self):
         self.recorder.actions = []
         self.update_log("Actions cleared")
-        self.update_status()
-        self.refresh_actions_display()
+        self.recorder.notify('actions')
     
     def edit_timing(self):
         selection = self.actions_tree.selection()
@@ -498,7 +1175,6 @@ class MacroRecorderGUI:
         del self.recorder.actions[action_index]
         self.update_log(f"Deleted action {action_index + 1}")
         self.refresh_actions_display()
-        self.update_status()
     
     def move_action_up(self):
         selection = self.actions_tree.selection()
@@ -554,11 +1230,17 @@ class MacroRecorderGUI:
     
     def refresh_actions_display(self):
         # Clear existing items
-        for item in self.actions_tree.get_children():
-            self.actions_tree.delete(item)
+        self.actions_tree.delete(*self.actions_tree.get_children())
         
         # Add actions to treeview
-        for i, action in enumerate(self.recorder.actions):
+        self.displayed_actions = self.recorder.actions
+        self.displayed_action_count = 0
+        self.append_actions_display()
+        self.actions_label.config(text=f"Actions recorded: {self.displayed_action_count}")
+    
+    def append_actions_display(self):
+        actions = self.displayed_actions
+        for action in actions[self.displayed_action_count:]:
             action_type = action[0]
             
             if action_type == 'move':
@@ -573,6 +1255,7 @@ class MacroRecorderGUI:
                 key_name, pressed, delay = action[1], action[2], action[3]
                 press_text = 'Press' if pressed else 'Release'
                 self.actions_tree.insert('', 'end', values=('Keyboard', key_name, '-', '-', press_text, f"{delay:.3f}"))
+            self.displayed_action_count += 1
     
     def save_macro(self):
         if not self.recorder.actions:
@@ -632,33 +1315,10 @@ class MacroRecorderGUI:
         
         if file_path:
             try:
-                with open(file_path, 'r') as f:
-                    macro_data = json.load(f)
-                
-                if 'actions' not in macro_data:
-                    self.update_log("Invalid macro file format")
-                    return
-                
-                # Convert back to proper format
-                loaded_actions = []
-                for action in macro_data['actions']:
-                    if action[0] == 'click':
-                        # Convert button string back to button object
-                        action[3] = Button.right if action[3] == 'right' else Button.left
-                        loaded_actions.append(tuple(action))
-                    elif action[0] == 'keypress':
-                        # Keyboard actions are already in correct format
-                        loaded_actions.append(tuple(action))
-                    else:
-                        # Mouse move actions
-                        loaded_actions.append(tuple(action))
-                
-                self.recorder.actions = loaded_actions
-                self.refresh_actions_display()
-                self.update_status()
+                macro_data = self.recorder.load_macro_file(file_path)
                 
                 created = macro_data.get('created', 'Unknown')
-                action_count = len(loaded_actions)
+                action_count = len(self.recorder.actions)
                 self.update_log(f"Loaded macro with {action_count} actions (created: {created})")
                 
             except Exception as e:
@@ -670,17 +1330,37 @@ class MacroRecorderGUI:
         status = "enabled" if enabled else "disabled"
         self.update_log(f"Keyboard recording {status}")
         
+    def toggle_verify_replay(self):
+        enabled = self.verify_enabled.get()
+        self.recorder.verify_replay = enabled
+        status = "enabled" if enabled else "disabled"
+        self.update_log(f"Replay verification {status}")
+        
+    def change_motion_rate(self, event=None):
+        selected = self.motion_rate_var.get()
+        rate = 0 if selected == "Raw" else int(selected.split()[0])
+        self.recorder.set_motion_rate(rate)
+        
     def update_status(self):
+        state = (self.recorder.recording, self.recorder.repeating, self.recorder.calibrating,
+                 self.recorder.verifying)
+        if state == self.rendered_state:
+            return
+        recording_changed = self.rendered_state is None or state[0] != self.rendered_state[0]
+        self.rendered_state = state
+        
         if self.recorder.recording:
             status = "🔴 Recording..."
-            self.record_btn.config(text="Stop Recording")
-            self.recording_notice.config(text="⚠️ Macro editing disabled during recording")
-            self.lock_editing_buttons()
+            if recording_changed:
+                self.record_btn.config(text="Stop Recording")
+                self.recording_notice.config(text="⚠️ Macro editing disabled during recording")
+                self.lock_editing_buttons()
         else:
             status = "⚪ Ready"
-            self.record_btn.config(text="Start Recording")
-            self.recording_notice.config(text="")
-            self.unlock_editing_buttons()
+            if recording_changed:
+                self.record_btn.config(text="Start Recording")
+                self.recording_notice.config(text="")
+                self.unlock_editing_buttons()
             
         if self.recorder.repeating:
             status += " | 🔄 Replaying..."
@@ -691,19 +1371,31 @@ class MacroRecorderGUI:
         if self.recorder.calibrating:
             status += " | 🎯 Calibrating..."
             
+        if self.recorder.verifying and not self.recorder.repeating:
+            status += " | 🔍 Verifying..."
+            
+        # The motion plan is built when replay starts, so the rate is fixed while it runs
+        replay_options_locked = self.recorder.recording or self.recorder.repeating
+        self.motion_rate_combo.config(state="disabled" if replay_options_locked else "readonly")
+        self.verify_checkbox.config(state="disabled" if replay_options_locked else "normal")
+            
         self.status_label.config(text=status)
-        self.actions_label.config(text=f"Actions recorded: {len(self.recorder.actions)}")
-        
-        config_text = (f"Screen: {self.recorder.screen_width}x{self.recorder.screen_height} | "
-                      f"Scale: ({self.recorder.scale_x:.2f}, {self.recorder.scale_y:.2f})")
-        self.config_label.config(text=config_text)
         
-        # Refresh actions display if actions count changed
-        current_action_count = len(self.actions_tree.get_children())
-        if current_action_count != len(self.recorder.actions):
+    def update_actions(self):
+        actions = self.recorder.actions
+        # A new list (cleared, loaded or re-recorded) needs a full redraw,
+        # while recording only ever appends to the displayed one
+        if actions is not self.displayed_actions or len(actions) < self.displayed_action_count:
             self.refresh_actions_display()
+        elif len(actions) > self.displayed_action_count:
+            self.append_actions_display()
+            self.actions_label.config(text=f"Actions recorded: {self.displayed_action_count}")
         
-        self.root.after(100, self.update_status)
+    def update_config(self):
+        config_text = (f"Screen: {self.recorder.screen_width}x{self.recorder.screen_height} | "
+                      f"Scale: ({self.recorder.scale_x:.2f}, {self.recorder.scale_y:.2f}) | "
+                      f"Motion: {self.motion_rate_var.get()}")
+        self.config_label.config(text=config_text)
         
     def lock_editing_buttons(self):
         self.clear_btn.config(state="disabled")
@@ -738,8 +1430,27 @@ class MacroRecorderGUI:
         except KeyboardInterrupt:
             pass
         finally:
+            self.event_bus.close()
             self.recorder.exit_flag = True
 
 if __name__ == "__main__":
+    import argparse
+    import sys
+    
+    parser = argparse.ArgumentParser(description="Macro Recorder")
+    parser.add_argument('--verify', metavar='MACRO',
+                        help="replay a saved macro without the GUI, verify it and exit non-zero on failure")
+    parser.add_argument('--passes', type=int, default=1, help="number of verified passes (default: 1)")
+    args = parser.parse_args()
+    
+    if args.verify:
+        recorder = MouseRecorderRepeater()
+        sys.exit(0 if recorder.verify_macro_file(args.verify, args.passes) else 1)
+    
+    # Hide console window on Windows
+    if os.name == 'nt':
+        import ctypes
+        ctypes.windll.user32.ShowWindow(ctypes.windll.kernel32.GetConsoleWindow(), 0)
+    
     app = MacroRecorderGUI()
     app.run()